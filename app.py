@@ -1,20 +1,86 @@
+import time
+_T0 = time.perf_counter()
+
 import os
 import sys
 import subprocess
+import threading
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout, QHBoxLayout,
     QLabel, QPushButton, QLineEdit, QTextEdit, QFileDialog, QGroupBox,
-    QMessageBox
+    QMessageBox, QCheckBox
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QObject, QTimer, Signal
 from PySide6.QtGui import QIcon
 
 
-from config import load_config, save_config
-from appveyor import download_latest_artifact, parse_project_url, get_last_successful_build
-from git_ops import git_pull, git_status, git_push, git_commit
-from miz_ops import extract_miz
+# appveyor (requests) and git_ops (GitPython) are imported on first use
+from config import load_config, save_config, load_cache, save_cache
+from miz_ops import (
+    stage_miz, swap_staged, staging_path, find_unused_resources, slim_miz
+)
+from asset_store import clean_assets, restore_assets, upload_assets
+from journal import (
+    load_journal, get_stage, begin_stage, update_stage, finish_stage,
+    fail_stage, pending_stages, file_sha256
+)
+
+# Cold start to usable window, tracked across releases in startup.log
+STARTUP_BUDGET_MS = 1500
+STARTUP_LOG = "startup.log"
+APP_REV = "1.0"
+
+_STARTUP_MARKS = {"import": time.perf_counter()}
+
+
+class RemoteVersionFetcher(QObject):
+    """
+    Looks up the latest AppVeyor build off the UI thread.
+    """
+    finished = Signal(str)
+
+    def fetch(self, project_url):
+        threading.Thread(target=self._run, args=(project_url,), daemon=True).start()
+
+    def _run(self, project_url):
+        from appveyor import parse_project_url, get_last_successful_build
+
+        try:
+            account, project = parse_project_url(project_url)
+            job_id, version = get_last_successful_build(account, project)
+        except Exception:
+            version = ""
+        self.finished.emit(version)
+
+
+class PushWorker(QObject):
+    """
+    Uploads offloaded assets and pushes off the UI thread, so progress
+    keeps painting and retry backoff does not freeze the window.
+    """
+    progress = Signal(str)
+    finished = Signal(str)
+    failed = Signal(str)
+
+    def push(self, repo_path, store_path=None):
+        threading.Thread(target=self._run, args=(repo_path, store_path), daemon=True).start()
+
+    def _run(self, repo_path, store_path):
+        from git_ops import git_push
+
+        try:
+            # Assets first, so pushed pointers never reference missing content
+            if store_path:
+                uploaded = upload_assets(repo_path, store_path)
+                total = sum(size for _, size in uploaded)
+                self.progress.emit(f"Uploaded {len(uploaded)} assets ({total} bytes)")
+
+            output = git_push(repo_path, progress=self.progress.emit)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(output)
 
 
 class MainWindow(QMainWindow):
@@ -28,20 +94,91 @@ class MainWindow(QMainWindow):
 
         icon_path = resource_path("assets/icon.ico")
 
+        _STARTUP_MARKS["window"] = time.perf_counter()
         self.cfg = load_config()
+        self.cache = load_cache()
+        self.journal = load_journal()
+        _STARTUP_MARKS["config"] = time.perf_counter()
+
+        self.version_fetcher = RemoteVersionFetcher()
+        self.version_fetcher.finished.connect(self.set_remote_version)
+
+        self.push_worker = PushWorker()
+        self.push_worker.progress.connect(self.push_progress)
+        self.push_worker.finished.connect(self.push_finished)
+        self.push_worker.failed.connect(self.push_failed)
 
         self.setWindowTitle("132nd vWing Mission Tool")
         self.setFixedSize(500, 700)
 
-        tabs = QTabWidget()
-        tabs.addTab(self.build_actions_tab(), "Actions")
-        tabs.addTab(self.build_config_tab(), "Config")
-        tabs.addTab(self.build_about_tab(), "About")
-       
-        self.setCentralWidget(tabs)
+        # Config and About are built the first time they are shown
+        self.tabs = QTabWidget()
+        self.tabs.addTab(self.build_actions_tab(), "Actions")
+        self.tab_builders = {
+            1: self.build_config_tab,
+            2: self.build_about_tab,
+        }
+        self.tabs.addTab(QWidget(), "Config")
+        self.tabs.addTab(QWidget(), "About")
+        self.tabs.currentChanged.connect(self.build_tab_on_show)
+
+        self.setCentralWidget(self.tabs)
 
         # runtime icon
         self.setWindowIcon(QIcon(icon_path))
+        _STARTUP_MARKS["widgets"] = time.perf_counter()
+
+    def build_tab_on_show(self, index):
+        builder = self.tab_builders.pop(index, None)
+        if not builder:
+            return
+
+        title = self.tabs.tabText(index)
+        placeholder = self.tabs.widget(index)
+
+        self.tabs.blockSignals(True)
+        self.tabs.removeTab(index)
+        self.tabs.insertTab(index, builder(), title)
+        self.tabs.setCurrentIndex(index)
+        self.tabs.blockSignals(False)
+
+        placeholder.deleteLater()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        if "paint" not in _STARTUP_MARKS:
+            # Runs once the event loop has painted the window
+            QTimer.singleShot(0, self.report_startup)
+
+    def report_startup(self):
+        _STARTUP_MARKS["paint"] = time.perf_counter()
+
+        # Each phase runs from the previous mark to its own
+        costs = []
+        last = _T0
+        for name in ("import", "qapp", "window", "config", "widgets", "paint"):
+            if name not in _STARTUP_MARKS:
+                continue
+            costs.append((name, (_STARTUP_MARKS[name] - last) * 1000))
+            last = _STARTUP_MARKS[name]
+        total = (last - _T0) * 1000
+
+        status = "OK" if total <= STARTUP_BUDGET_MS else "OVER BUDGET"
+        breakdown = ", ".join(f"{name} {ms:.0f} ms" for name, ms in costs)
+        self.output_window.append(
+            f"[Startup] {breakdown}\n"
+            f"  Total: {total:.0f} ms (budget {STARTUP_BUDGET_MS} ms) {status}\n"
+        )
+
+        try:
+            with open(STARTUP_LOG, "a") as f:
+                f.write(
+                    f"{time.strftime('%Y-%m-%d %H:%M:%S')},rev {APP_REV},"
+                    + ",".join(f"{name}={ms:.0f}" for name, ms in costs)
+                    + f",total={total:.0f}\n"
+                )
+        except OSError:
+            pass
 
 
     # ---------------------------------------------------------
@@ -138,6 +275,16 @@ class MainWindow(QMainWindow):
         extract_btn.clicked.connect(self.extract_action)
         reorder_layout.addWidget(extract_btn)
 
+        # Unused resources
+        row_unused = QHBoxLayout()
+        find_unused_btn = QPushButton("Find Unused Resources")
+        find_unused_btn.clicked.connect(self.find_unused_action)
+        slim_btn = QPushButton("Write Slimmed .miz")
+        slim_btn.clicked.connect(self.slim_action)
+        row_unused.addWidget(find_unused_btn)
+        row_unused.addWidget(slim_btn)
+        reorder_layout.addLayout(row_unused)
+
         reorder_group.setLayout(reorder_layout)
         layout.addWidget(reorder_group)
 
@@ -165,11 +312,11 @@ class MainWindow(QMainWindow):
         row5 = QHBoxLayout()
         commit_btn = QPushButton("Commit")
         commit_btn.clicked.connect(self.git_commit_action)
-        push_btn = QPushButton("Push")
-        push_btn.clicked.connect(self.git_push_action)
+        self.push_btn = QPushButton("Push")
+        self.push_btn.clicked.connect(self.git_push_action)
 
         row5.addWidget(commit_btn)
-        row5.addWidget(push_btn)
+        row5.addWidget(self.push_btn)
         commit_layout.addLayout(row5)
 
         commit_group.setLayout(commit_layout)
@@ -188,7 +335,14 @@ class MainWindow(QMainWindow):
         exit_row.addWidget(exit_btn)
         layout.addLayout(exit_row)
 
+        # Actions that touch the journal, the repo or its refs.
+        # Disabled together while a push runs in the background.
+        self.pipeline_buttons = [
+            download_btn, pull_btn, status_btn, extract_btn, commit_btn, self.push_btn
+        ]
+
         self.update_versions()
+        self.report_pending_stages()
 
         return tab
 
@@ -270,8 +424,43 @@ class MainWindow(QMainWindow):
         hint4.setContentsMargins(100, 0, 0, 0)   # indent without affecting layout stretch
         git_layout.addWidget(hint4)
 
+        # ---------------- Frame 3: Large Assets ----------------
+        assets_group = QGroupBox("Large Asset Store (optional)")
+        assets_layout = QVBoxLayout()
+
+        self.assets_enabled_check = QCheckBox("Keep large sounds/images out of git history")
+        self.assets_enabled_check.setChecked(self.cfg["assets"]["enabled"])
+        assets_layout.addWidget(self.assets_enabled_check)
+
+        # Row 1: Store path
+        row_store = QHBoxLayout()
+        row_store.addWidget(QLabel("Store Path:"))
+        self.store_path_edit = QLineEdit(self.cfg["assets"]["store_path"])
+        browse3 = QPushButton("Browse")
+        browse3.clicked.connect(lambda: self.pick_folder(self.store_path_edit))
+        row_store.addWidget(self.store_path_edit)
+        row_store.addWidget(browse3)
+        assets_layout.addLayout(row_store)
+
+        # Row 2: Size threshold
+        row_threshold = QHBoxLayout()
+        row_threshold.addWidget(QLabel("Size Threshold (bytes):"))
+        self.threshold_edit = QLineEdit(str(self.cfg["assets"]["threshold"]))
+        row_threshold.addWidget(self.threshold_edit)
+        assets_layout.addLayout(row_threshold)
+
+        # Row 3: Extensions
+        row_ext = QHBoxLayout()
+        row_ext.addWidget(QLabel("Extensions:"))
+        self.extensions_edit = QLineEdit(", ".join(self.cfg["assets"]["extensions"]))
+        row_ext.addWidget(self.extensions_edit)
+        assets_layout.addLayout(row_ext)
+
+        assets_group.setLayout(assets_layout)
+
         layout.addWidget(miz_group)
         layout.addWidget(git_group)
+        layout.addWidget(assets_group)
         layout.addStretch()
 
         # Save + Exit
@@ -302,7 +491,7 @@ class MainWindow(QMainWindow):
         about_text = QLabel(
             "132nd vWing Mission Tool\n\n"
             "Manages .miz files, Appveyor builds, and Git repositories.\n"
-            "Rev 1.0.\n\n"
+            f"Rev {APP_REV}.\n\n"
             "Contact 132nd.Jonde for help"
         )
         about_text.setWordWrap(True)
@@ -356,6 +545,27 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.output_window.append(f"[Open Repo] xdg-open failed: {e}")
 
+    def report_pending_stages(self):
+        pending = pending_stages(self.journal)
+        if not pending:
+            return
+
+        interrupted = [(n, s) for n, s in pending if s != "failed"]
+        failed = [n for n, s in pending if s == "failed"]
+
+        if interrupted:
+            self.output_window.append("[Journal] Previous run was interrupted:")
+            for name, status in interrupted:
+                self.output_window.append(f"  {name}: {status}")
+            self.output_window.append("Run the step again to resume it.\n")
+
+        if failed:
+            self.output_window.append("[Journal] Last attempt failed:")
+            for name in failed:
+                error = get_stage(self.journal, name).get("error", "")
+                self.output_window.append(f"  {name}: {error}")
+            self.output_window.append("")
+
     def find_latest_miz(self):
         files = [f for f in os.listdir(self.cfg["miz"]["miz_path"]) if f.endswith(".miz")]
 
@@ -386,13 +596,20 @@ class MainWindow(QMainWindow):
         except Exception as e:
             self.local_version_label.setText(f"error ({e})")
 
-        # Remote version
-        try:
-            account, project = parse_project_url(self.cfg["miz"]["miz_url"])
-            job_id, version = get_last_successful_build(account, project)
-            self.remote_version_label.setText(version)
-        except Exception:
+        # Remote version: last known value now, fresh value when it arrives
+        cached = self.cache.get("remote_version")
+        self.remote_version_label.setText(f"{cached} (cached)" if cached else "checking...")
+        self.version_fetcher.fetch(self.cfg["miz"]["miz_url"])
+
+    def set_remote_version(self, version):
+        if not version:
             self.remote_version_label.setText("no file")
+            return
+
+        self.remote_version_label.setText(version)
+        if version != self.cache.get("remote_version"):
+            self.cache["remote_version"] = version
+            save_cache(self.cache)
 
     def download_action(self):
         try:
@@ -400,23 +617,41 @@ class MainWindow(QMainWindow):
             self.output_window.append("[Download] Downloading...")
             QApplication.processEvents()   # force UI update
 
+            begin_stage(self.journal, "download")
+
+            from appveyor import download_latest_artifact
+
             result = download_latest_artifact(
                 self.cfg["miz"]["miz_url"],
                 self.cfg["miz"]["miz_path"]
             )
 
+            finish_stage(
+                self.journal, "download",
+                path=result["path"],
+                version=result["version"],
+                sha256=result["sha256"],
+            )
+
+            if result["cached"]:
+                self.output_window.append("[Download] Already downloaded from this build")
+            elif result["resumed"]:
+                self.output_window.append("[Download] Resumed from previous run")
+
             self.output_window.append(
                 "[Download] Completed\n"
                 f"  Version   : {result['version']}\n"
                 f"  Artifact  : {result['artifact']}\n"
                 f"  Job ID    : {result['job_id']}\n"
                 f"  Size      : {result['bytes']} bytes\n"
+                f"  SHA256    : {result['sha256']}\n"
                 f"  Saved to  : {result['path']}\n"
             )
 
             self.update_versions()
 
         except Exception as e:
+            fail_stage(self.journal, "download", e)
             self.output_window.append(f"[Download Error] {e}\n")
 
     def extract_action(self):
@@ -429,10 +664,23 @@ class MainWindow(QMainWindow):
             override = self.override_miz_edit.text().strip()
             miz_path = override if override else os.path.join(self.cfg["miz"]["miz_path"], latest)
 
-            extracted, overwritten = extract_miz(
-                miz_path,
-                self.cfg["git"]["repo_path"]
-            )
+            repo_path = self.cfg["git"]["repo_path"]
+            miz_sha = file_sha256(miz_path)
+            stage = get_stage(self.journal, "extract")
+
+            if (stage and stage["status"] == "staged"
+                    and stage["sha256"] == miz_sha
+                    and os.path.isdir(staging_path(repo_path))):
+                # Interrupted during the swap: only finish moving files
+                self.output_window.append("[MIZ Extract] Resuming interrupted extract")
+                manifest = stage["manifest"]
+            else:
+                begin_stage(self.journal, "extract", source=miz_path, sha256=miz_sha)
+                manifest = stage_miz(miz_path, repo_path)
+                update_stage(self.journal, "extract", "staged", manifest=manifest)
+
+            extracted, overwritten = swap_staged(repo_path, manifest)
+            finish_stage(self.journal, "extract")
 
             self.output_window.append(
                 "[MIZ Extract]\n"
@@ -449,9 +697,72 @@ class MainWindow(QMainWindow):
             self.output_window.append("")
 
         except Exception as e:
+            fail_stage(self.journal, "extract", e)
             self.output_window.append(f"[MIZ Extract Error] {e}\n")
 
 
+    def selected_miz(self):
+        override = self.override_miz_edit.text().strip()
+        if override:
+            return override
+
+        latest = self.find_latest_miz()
+        if not latest:
+            return None
+        return os.path.join(self.cfg["miz"]["miz_path"], latest)
+
+    def find_unused_action(self):
+        try:
+            miz_path = self.selected_miz()
+            if not miz_path:
+                self.output_window.append("[Unused Resources] No .miz file found.\n")
+                return
+
+            unused = find_unused_resources(miz_path)
+            total = sum(size for _, size in unused)
+
+            self.output_window.append(
+                "[Unused Resources]\n"
+                f"  Source: {miz_path}\n"
+                f"  Unused files: {len(unused)}\n"
+                f"  Reclaimable: {total} bytes\n"
+            )
+            for name, size in unused:
+                self.output_window.append(f"  UNUSED: {name} ({size} bytes)")
+
+            self.output_window.append("")
+
+        except Exception as e:
+            self.output_window.append(f"[Unused Resources Error] {e}\n")
+
+    def slim_action(self):
+        try:
+            miz_path = self.selected_miz()
+            if not miz_path:
+                self.output_window.append("[Slim MIZ] No .miz file found.\n")
+                return
+
+            out_path = os.path.splitext(miz_path)[0] + "-slim.miz"
+            removed = slim_miz(miz_path, out_path)
+
+            before = os.path.getsize(miz_path)
+            after = os.path.getsize(out_path)
+
+            self.output_window.append(
+                "[Slim MIZ]\n"
+                f"  Source: {miz_path}\n"
+                f"  Removed files: {len(removed)}\n"
+                f"  Size: {before} -> {after} bytes\n"
+                f"  Saved to: {out_path}\n"
+            )
+            for name in removed:
+                self.output_window.append(f"  REMOVE: {name}")
+
+            self.output_window.append("")
+
+        except Exception as e:
+            self.output_window.append(f"[Slim MIZ Error] {e}\n")
+
     def git_pull_action(self):
         repo_path = self.cfg["git"]["repo_path"]
         remote_url = self.cfg["git"]["repo_url"]  # ensure this exists in config
@@ -478,6 +789,7 @@ class MainWindow(QMainWindow):
 
                 if result.returncode == 0:
                     self.output_window.append("[Git Pull] Clone completed successfully.\n")
+                    self.restore_assets_action()
                 else:
                     self.output_window.append(f"[Git Pull Error] Clone failed with code {result.returncode}\n")
 
@@ -489,7 +801,13 @@ class MainWindow(QMainWindow):
         # CASE 2: Repo exists → normal pull
         # ---------------------------------------------------------
         try:
-            output = git_pull(repo_path)
+            from git_ops import git_pull
+
+            self.clean_assets_action()
+            try:
+                output = git_pull(repo_path)
+            finally:
+                self.restore_assets_action()
             self.output_window.append(f"[Git Pull]\n{output}\n")
         except Exception as e:
             self.output_window.append(
@@ -498,9 +816,42 @@ class MainWindow(QMainWindow):
                 "to create your local repo.\n"
             )
 
+    # Git only ever sees pointer files for offloaded assets; the working
+    # tree holds the real content between git commands.
+    def clean_assets_action(self, rules=None):
+        if self.cfg["assets"]["enabled"]:
+            clean_assets(self.cfg["git"]["repo_path"], rules)
+
+    def restore_assets_action(self):
+        if not self.cfg["assets"]["enabled"]:
+            return
+
+        try:
+            restored, downloaded, missing = restore_assets(
+                self.cfg["git"]["repo_path"],
+                self.cfg["assets"]["store_path"]
+            )
+            if downloaded or missing:
+                total = sum(size for _, size in downloaded)
+                self.output_window.append(
+                    "[Assets] Restore\n"
+                    f"  Fetched: {len(downloaded)} ({total} bytes)\n"
+                    f"  Missing from store: {len(missing)}\n"
+                )
+            for f in missing:
+                self.output_window.append(f"  MISSING: {f}")
+        except Exception as e:
+            self.output_window.append(f"[Assets Error] {e}\n")
+
     def git_status_action(self):
         try:
-            output = git_status(self.cfg["git"]["repo_path"])
+            from git_ops import git_status
+
+            self.clean_assets_action()
+            try:
+                output = git_status(self.cfg["git"]["repo_path"])
+            finally:
+                self.restore_assets_action()
             self.output_window.append(f"[Git Status]\n{output}\n")
         except Exception as e:
             self.output_window.append(f"[Git Status Error] {e}\n")
@@ -515,22 +866,55 @@ class MainWindow(QMainWindow):
             return
 
         try:
-            output = git_commit(
-                self.cfg["git"]["repo_path"],
-                message
-            )
+            from git_ops import git_commit, git_head
+
+            repo_path = self.cfg["git"]["repo_path"]
+            begin_stage(self.journal, "commit", message=message)
+            self.clean_assets_action(self.cfg["assets"])
+            try:
+                output = git_commit(repo_path, message)
+            finally:
+                self.restore_assets_action()
+            finish_stage(self.journal, "commit", sha=git_head(repo_path))
             self.output_window.append(f"[Git Commit]\n{output}\n")
             self.commit_message_edit.clear()
         except Exception as e:
+            fail_stage(self.journal, "commit", e)
             self.output_window.append(f"[Git Commit Error] {e}\n")
 
 
     def git_push_action(self):
         try:
-            output = git_push(self.cfg["git"]["repo_path"])
-            self.output_window.append(f"[Git Push]\n{output}\n")
+            from git_ops import git_head
+
+            repo_path = self.cfg["git"]["repo_path"]
+            begin_stage(self.journal, "push", sha=git_head(repo_path))
         except Exception as e:
             self.output_window.append(f"[Git Push Error] {e}\n")
+            return
+
+        store_path = self.cfg["assets"]["store_path"] if self.cfg["assets"]["enabled"] else None
+
+        self.set_pipeline_enabled(False)
+        self.output_window.append("[Git Push] Pushing...")
+        self.push_worker.push(repo_path, store_path)
+
+    def push_progress(self, line):
+        self.output_window.append(f"  {line}")
+
+    def set_pipeline_enabled(self, enabled):
+        for btn in self.pipeline_buttons:
+            btn.setEnabled(enabled)
+
+    def push_finished(self, output):
+        self.set_pipeline_enabled(True)
+        finish_stage(self.journal, "push")
+        self.output_window.append(f"[Git Push]\n{output}\n")
+
+    def push_failed(self, error):
+        self.set_pipeline_enabled(True)
+        fail_stage(self.journal, "push", error)
+        self.output_window.append(f"[Git Push Error] {error}\n")
 
 
     # ---------------------------------------------------------
@@ -541,6 +925,17 @@ class MainWindow(QMainWindow):
         self.cfg["miz"]["miz_url"] = self.appveyor_url_edit.text()
         self.cfg["git"]["repo_path"] = self.repo_path_edit.text()
         self.cfg["git"]["repo_url"] = self.repo_url_edit.text()
+        self.cfg["assets"]["enabled"] = self.assets_enabled_check.isChecked()
+        self.cfg["assets"]["store_path"] = self.store_path_edit.text()
+        self.cfg["assets"]["extensions"] = [
+            e.strip().lower() for e in self.extensions_edit.text().split(",") if e.strip()
+        ]
+
+        try:
+            self.cfg["assets"]["threshold"] = int(self.threshold_edit.text())
+        except ValueError:
+            QMessageBox.warning(self, "Invalid", "Size threshold must be a number")
+            return
 
         save_config(self.cfg)
         QMessageBox.information(self, "Saved", "Settings saved")
@@ -564,6 +959,7 @@ class MainWindow(QMainWindow):
 # ---------------------------------------------------------
 if __name__ == "__main__":
     app = QApplication(sys.argv)
+    _STARTUP_MARKS["qapp"] = time.perf_counter()
     window = MainWindow()
     window.show()
     sys.exit(app.exec())
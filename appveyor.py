@@ -1,9 +1,17 @@
+import glob
+import json
 import os
 import requests
 from urllib.parse import urlparse
 
+from journal import file_sha256
+
 API_BASE = "https://ci.appveyor.com/api"
 
+# (connect, read) seconds. A connection that stalls, e.g. after the
+# machine sleeps, raises instead of hanging; Download resumes the .part.
+TIMEOUT = (10, 60)
+
 
 def parse_project_url(project_url: str):
     """
@@ -24,7 +32,7 @@ def get_last_successful_build(account, project):
     Returns (job_id, build_version)
     """
     url = f"{API_BASE}/projects/{account}/{project}"
-    r = requests.get(url)
+    r = requests.get(url, timeout=TIMEOUT)
     r.raise_for_status()
     data = r.json()
 
@@ -44,7 +52,7 @@ def download_latest_artifact(project_url, download_dir):
     job_id, version = get_last_successful_build(account, project)
 
     artifacts_url = f"{API_BASE}/buildjobs/{job_id}/artifacts"
-    r = requests.get(artifacts_url)
+    r = requests.get(artifacts_url, timeout=TIMEOUT)
     r.raise_for_status()
     artifacts = r.json()
 
@@ -52,28 +60,94 @@ def download_latest_artifact(project_url, download_dir):
         raise RuntimeError("No artifacts found in successful build")
 
     artifact_name = artifacts[0]["fileName"]
+    expected_size = artifacts[0].get("size")
 
     download_url = f"{API_BASE}/buildjobs/{job_id}/artifacts/{artifact_name}"
 
-    r = requests.get(download_url, stream=True)
-    r.raise_for_status()
-
     os.makedirs(download_dir, exist_ok=True)
     out_path = os.path.join(download_dir, artifact_name)
+    # Partial files are tied to the build job, so a resume never
+    # stitches bytes from a different build onto this one
+    part_path = f"{out_path}.{job_id}.part"
+    for stale in glob.glob(glob.escape(out_path) + ".*.part"):
+        if stale != part_path:
+            os.remove(stale)
+
+    # Already downloaded from this same build job, and not edited since
+    done = _read_sidecar(out_path)
+    if (done and done.get("job_id") == job_id and os.path.exists(out_path)
+            and file_sha256(out_path) == done.get("sha256")):
+        return {
+            "path": out_path,
+            "version": version,
+            "artifact": artifact_name,
+            "bytes": os.path.getsize(out_path),
+            "job_id": job_id,
+            "sha256": done["sha256"],
+            "resumed": False,
+            "cached": True,
+        }
+
+    # Continue an interrupted download where it stopped
+    offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+
+    r = requests.get(download_url, stream=True, headers=headers, timeout=TIMEOUT)
+    if r.status_code == 416:
+        # Range not satisfiable: the part file is stale
+        offset = 0
+        r = requests.get(download_url, stream=True, timeout=TIMEOUT)
+    r.raise_for_status()
+
+    if r.status_code != 206:
+        offset = 0
 
-    size = 0
-    with open(out_path, "wb") as f:
+    size = offset
+    with open(part_path, "ab" if offset else "wb") as f:
         for chunk in r.iter_content(chunk_size=8192):
             if chunk:
                 f.write(chunk)
                 size += len(chunk)
 
+    if expected_size is not None and size != expected_size:
+        if size > expected_size:
+            os.remove(part_path)
+        raise RuntimeError(
+            f"Download incomplete: got {size} of {expected_size} bytes. "
+            "Download again to resume."
+        )
+
+    os.replace(part_path, out_path)
+    sha256 = file_sha256(out_path)
+    _write_sidecar(out_path, job_id, sha256)
+
     return {
         "path": out_path,
         "version": version,
         "artifact": artifact_name,
         "bytes": size,
         "job_id": job_id,
+        "sha256": sha256,
+        "resumed": offset > 0,
+        "cached": False,
     }
 
 
+def _sidecar_path(out_path):
+    return out_path + ".download.json"
+
+
+def _read_sidecar(out_path):
+    """
+    Returns {"job_id", "sha256"} recorded when out_path was downloaded.
+    """
+    try:
+        with open(_sidecar_path(out_path), "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_sidecar(out_path, job_id, sha256):
+    with open(_sidecar_path(out_path), "w") as f:
+        json.dump({"job_id": job_id, "sha256": sha256}, f, indent=2)
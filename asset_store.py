@@ -0,0 +1,238 @@
+import json
+import os
+import re
+import shutil
+import sys
+
+from journal import file_sha256
+
+POINTER_HEADER = "miztool-asset v1"
+POINTER_MAX_SIZE = 200
+OID_RE = re.compile(r"sha256 ([0-9a-f]{64})")
+SIZE_RE = re.compile(r"size (\d+)")
+
+# Mission Lua tables have no extension; they must stay diffable in git
+TEXT_EXTENSIONS = ("", ".lua", ".txt", ".json", ".cfg")
+
+
+def asset_cache_path(repo_path):
+    """
+    Local object cache next to the repo, like the extract staging
+    directory. Kept out of both the working tree and .git.
+    """
+    return os.path.normpath(repo_path) + ".assets"
+
+
+def _object_path(root, oid):
+    return os.path.join(root, oid[:2], oid)
+
+
+def _store_object(src, root, oid):
+    """
+    Copy a file into a content-addressed directory.
+    Writes to a temp name first so a partial copy is never visible.
+    """
+    dst = _object_path(root, oid)
+    if os.path.exists(dst):
+        return False
+
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    tmp = dst + ".tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+    return True
+
+
+def _load_restored(cache):
+    """
+    Paths currently holding real content in place of a pointer,
+    as {path: [oid, size, mtime]}.
+    """
+    path = os.path.join(cache, "restored.json")
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_restored(cache, restored):
+    os.makedirs(cache, exist_ok=True)
+    path = os.path.join(cache, "restored.json")
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(restored, f, indent=2)
+    os.replace(tmp, path)
+
+
+def should_offload(name, size, rules):
+    ext = os.path.splitext(name)[1].lower()
+    # Checked first: text stays in git whatever the extension list says
+    if ext in TEXT_EXTENSIONS:
+        return False
+    if ext in rules.get("extensions", []):
+        return True
+    threshold = rules.get("threshold", 0)
+    return bool(threshold) and size >= threshold
+
+
+def write_pointer(path, oid, size):
+    with open(path, "w", newline="\n") as f:
+        f.write(f"{POINTER_HEADER}\nsha256 {oid}\nsize {size}\n")
+
+
+def read_pointer(path):
+    """
+    Returns (oid, size) if path is a pointer file, otherwise None.
+    """
+    if os.path.getsize(path) > POINTER_MAX_SIZE:
+        return None
+
+    try:
+        with open(path, "r") as f:
+            lines = f.read().splitlines()
+    except (OSError, UnicodeDecodeError):
+        return None
+
+    if len(lines) != 3 or lines[0] != POINTER_HEADER:
+        return None
+
+    # Anything else (e.g. a pointer left with conflict markers) is not a pointer
+    oid = OID_RE.fullmatch(lines[1])
+    size = SIZE_RE.fullmatch(lines[2])
+    if not oid or not size:
+        return None
+
+    return oid.group(1), int(size.group(1))
+
+
+def _walk_files(repo_path):
+    for root, dirs, files in os.walk(repo_path):
+        if ".git" in dirs:
+            dirs.remove(".git")
+        for name in files:
+            path = os.path.join(root, name)
+            yield os.path.relpath(path, repo_path).replace(os.sep, "/"), path
+
+
+def find_pointers(repo_path):
+    """
+    Returns [(relative path, oid, size)] for all pointer files in the repo.
+    """
+    pointers = []
+    for rel, path in _walk_files(repo_path):
+        pointer = read_pointer(path)
+        if pointer:
+            pointers.append((rel, *pointer))
+    return pointers
+
+
+def clean_assets(repo_path, rules=None):
+    """
+    Turn restored assets back into pointer files before a git command,
+    so git only ever sees pointers. Assets edited since they were
+    restored get a new object in the cache.
+
+    With rules, other files in the tree that match them are offloaded
+    too; that is how new assets enter the store at commit time.
+    Returns the list of paths turned into pointers.
+    """
+    cache = asset_cache_path(repo_path)
+    restored = _load_restored(cache)
+
+    candidates = dict(restored)
+    if rules:
+        for rel, path in _walk_files(repo_path):
+            if rel not in candidates and should_offload(rel, os.path.getsize(path), rules):
+                candidates[rel] = None
+
+    cleaned = []
+    for rel, record in candidates.items():
+        path = os.path.join(repo_path, rel)
+        restored.pop(rel, None)
+
+        if not os.path.exists(path) or read_pointer(path):
+            continue
+
+        stat = os.stat(path)
+        if record and record[1:] == [stat.st_size, stat.st_mtime]:
+            # Untouched since restore, content is already in the cache
+            oid = record[0]
+        else:
+            oid = file_sha256(path)
+            _store_object(path, cache, oid)
+
+        write_pointer(path, oid, stat.st_size)
+        cleaned.append(rel)
+
+    _save_restored(cache, restored)
+    return cleaned
+
+
+def restore_assets(repo_path, store_path=None):
+    """
+    Replace pointer files with their content, fetching objects the
+    cache does not have from the store. Run after every git command,
+    and by the build before packing the .miz.
+    Returns (restored, downloaded, missing).
+    """
+    cache = asset_cache_path(repo_path)
+    restored = _load_restored(cache)
+    done = []
+    downloaded = []
+    missing = []
+
+    for rel, oid, size in find_pointers(repo_path):
+        src = _object_path(cache, oid)
+        if not os.path.exists(src):
+            remote = _object_path(store_path, oid) if store_path else None
+            if not remote or not os.path.exists(remote):
+                missing.append(rel)
+                continue
+            _store_object(remote, cache, oid)
+            downloaded.append((rel, size))
+
+        path = os.path.join(repo_path, rel)
+        tmp = path + ".tmp"
+        shutil.copyfile(src, tmp)
+        os.replace(tmp, path)
+
+        stat = os.stat(path)
+        restored[rel] = [oid, stat.st_size, stat.st_mtime]
+        done.append(rel)
+
+    _save_restored(cache, restored)
+    return done, downloaded, missing
+
+
+def upload_assets(repo_path, store_path):
+    """
+    Copy every cached object the store does not have yet.
+    Run before git_push so pushed pointers never reference
+    missing content.
+    """
+    cache = asset_cache_path(repo_path)
+    uploaded = []
+
+    for root, dirs, files in os.walk(cache):
+        for oid in files:
+            if len(oid) != 64:
+                continue
+            if _store_object(os.path.join(root, oid), store_path, oid):
+                uploaded.append((oid, os.path.getsize(os.path.join(root, oid))))
+
+    return uploaded
+
+
+if __name__ == "__main__":
+    # Build step: python asset_store.py <repo folder> <store folder>
+    if len(sys.argv) != 3:
+        sys.exit("usage: asset_store.py <repo folder> <store folder>")
+
+    done, downloaded, missing = restore_assets(sys.argv[1], sys.argv[2])
+    print(f"Restored: {len(done)}  Fetched: {len(downloaded)}  Missing: {len(missing)}")
+    for rel in missing:
+        print(f"  MISSING: {rel}")
+    sys.exit(1 if missing else 0)
@@ -3,6 +3,9 @@ import os
 
 CONFIG_FILE = "settings.json"
 
+# Last known state, painted at startup before anything is refreshed
+CACHE_FILE = "cache.json"
+
 DEFAULT_CONFIG = {
     "miz": {
         "miz_path": "miz file folder",
@@ -11,6 +14,12 @@ DEFAULT_CONFIG = {
     "git": {
         "repo_path": "repo folder",
         "repo_url": "https://github.com/132nd-vWing/TRMA"
+    },
+    "assets": {
+        "enabled": False,
+        "store_path": "asset store folder",
+        "threshold": 1048576,
+        "extensions": [".ogg", ".wav", ".png", ".jpg"]
     }
 }
 
@@ -18,8 +27,26 @@ def load_config():
     if not os.path.exists(CONFIG_FILE):
         return DEFAULT_CONFIG.copy()
     with open(CONFIG_FILE, "r") as f:
-        return json.load(f)
+        config = json.load(f)
+
+    # Settings files saved before a section existed
+    for key, value in DEFAULT_CONFIG.items():
+        config.setdefault(key, dict(value))
+    return config
 
 def save_config(config):
     with open(CONFIG_FILE, "w") as f:
         json.dump(config, f, indent=2)
+
+def load_cache():
+    if not os.path.exists(CACHE_FILE):
+        return {}
+    try:
+        with open(CACHE_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_cache(cache):
+    with open(CACHE_FILE, "w") as f:
+        json.dump(cache, f, indent=2)
@@ -1,6 +1,7 @@
-from git import Repo
+import re
+import time
 
-from git import Repo
+from git import Repo, RemoteProgress, PushInfo, GitCommandError
 
 def git_pull(repo_path):
     repo = Repo(repo_path)
@@ -60,21 +61,125 @@ def git_commit(repo_path, message):
         f"Deletions: {deletions}"
     )
 
-def git_push(repo_path):
+class PushProgress(RemoteProgress):
+    """
+    Forwards git's push progress to a callback, one line per
+    stage and every 10% within a stage.
+    """
+
+    STAGES = {
+        RemoteProgress.COUNTING: "Counting objects",
+        RemoteProgress.COMPRESSING: "Compressing objects",
+        RemoteProgress.WRITING: "Writing objects",
+        RemoteProgress.RESOLVING: "Resolving deltas",
+    }
+
+    def __init__(self, callback):
+        super().__init__()
+        self.callback = callback
+        self.last = None
+        self.last_line = None
+
+    def update(self, op_code, cur_count, max_count=None, message=""):
+        stage = self.STAGES.get(op_code & RemoteProgress.OP_MASK)
+        if not stage:
+            return
+
+        percent = int(cur_count * 100 / max_count) if max_count else 0
+        key = (stage, percent // 10)
+        if key == self.last and not op_code & RemoteProgress.END:
+            return
+        self.last = key
+
+        line = f"{stage}: {int(cur_count)}"
+        if max_count:
+            line += f"/{int(max_count)} ({percent}%)"
+        if message:
+            # e.g. "1.20 MiB | 850.00 KiB/s"
+            line += f" {message.strip(', ')}"
+        if line != self.last_line:
+            self.last_line = line
+            self.callback(line)
+
+
+# stderr fragments that mean the network failed, not the push
+TRANSIENT_ERRORS = (
+    "could not resolve host",
+    "connection reset",
+    "connection timed out",
+    "operation timed out",
+    "early eof",
+    "rpc failed",
+    "the remote end hung up",
+)
+
+# Gateway errors, e.g. "The requested URL returned error: 503"
+# or "RPC failed; HTTP 502"
+TRANSIENT_HTTP_RE = re.compile(r"(error:|http) 50[234]\b")
+
+
+def _is_transient(error):
+    text = str(error).lower()
+    return (any(fragment in text for fragment in TRANSIENT_ERRORS)
+            or bool(TRANSIENT_HTTP_RE.search(text)))
+
+
+def git_push(repo_path, progress=None, retries=3, backoff=2):
+    """
+    Push to origin, retrying transient network failures with
+    exponential backoff. progress is an optional callback that
+    receives one status line at a time. Blocks while waiting to
+    retry, so call it off the UI thread.
+
+    Raises RuntimeError if any ref was not updated.
+    """
     repo = Repo(repo_path)
-    results = repo.remotes.origin.push()
+    report = progress or (lambda line: None)
+
+    for attempt in range(retries + 1):
+        try:
+            results = repo.remotes.origin.push(
+                progress=PushProgress(report) if progress else None
+            )
+            break
+        except GitCommandError as e:
+            if attempt == retries or not _is_transient(e):
+                raise
+            delay = backoff * 2 ** attempt
+            report(f"Network error, retrying in {delay}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
 
     lines = []
+    behind = failed = False
     for r in results:
         local = r.local_ref.name if r.local_ref else "unknown"
         remote = r.remote_ref.name if r.remote_ref else "unknown"
         lines.append(
-            f"{local} -> {remote} : {r.summary}"
+            f"{local} -> {remote} : {r.summary.strip()}"
         )
+        if r.flags & PushInfo.REJECTED:
+            behind = True
+        if r.flags & (PushInfo.REJECTED | PushInfo.REMOTE_REJECTED | PushInfo.ERROR):
+            failed = True
+
+    if behind:
+        lines.append(
+            "Push rejected: the remote has commits you don't have.\n"
+            "Use Git Pull to fast-forward (or rebase your commit on top),\n"
+            "then Push again."
+        )
+
+    if failed:
+        raise RuntimeError("\n".join(lines))
 
     return "\n".join(lines) or "Nothing to push."
 
 
+def git_head(repo_path):
+    repo = Repo(repo_path)
+    return repo.head.commit.hexsha
+
+
 def git_status(repo_path):
     repo = Repo(repo_path)
     return repo.git.status()
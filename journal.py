@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import time
+
+JOURNAL_FILE = "journal.json"
+
+# Pipeline order. Redoing a stage invalidates everything after it.
+STAGES = ["download", "extract", "commit", "push"]
+
+
+def load_journal():
+    if not os.path.exists(JOURNAL_FILE):
+        return {"stages": {}}
+    try:
+        with open(JOURNAL_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        # Unreadable journal, start from scratch
+        return {"stages": {}}
+
+
+def save_journal(journal):
+    """
+    Write the journal atomically so a crash mid-write never leaves
+    a half-written file behind.
+    """
+    tmp = JOURNAL_FILE + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(journal, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, JOURNAL_FILE)
+
+
+def get_stage(journal, name):
+    return journal["stages"].get(name)
+
+
+def begin_stage(journal, name, **info):
+    for later in STAGES[STAGES.index(name) + 1:]:
+        journal["stages"].pop(later, None)
+
+    journal["stages"][name] = {
+        "status": "running",
+        "started": time.time(),
+        **info,
+    }
+    save_journal(journal)
+
+
+def update_stage(journal, name, status, **info):
+    stage = journal["stages"].get(name)
+    if not stage:
+        # Reset by an earlier stage being redone; nothing to update
+        return
+    stage.update(status=status, **info)
+    save_journal(journal)
+
+
+def finish_stage(journal, name, **outputs):
+    update_stage(journal, name, "done", finished=time.time(), **outputs)
+
+
+def fail_stage(journal, name, error):
+    """
+    Mark a stage that stopped on an error, as opposed to one that
+    was interrupted. Stages already staged keep their status so
+    they can still be resumed.
+    """
+    stage = journal["stages"].get(name)
+    if stage and stage["status"] == "running":
+        update_stage(journal, name, "failed", error=str(error))
+
+
+def pending_stages(journal):
+    """
+    Returns [(name, status)] for stages that were started but never finished.
+    """
+    return [
+        (name, journal["stages"][name]["status"])
+        for name in STAGES
+        if name in journal["stages"] and journal["stages"][name]["status"] != "done"
+    ]
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
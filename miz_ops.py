@@ -1,13 +1,144 @@
 import zipfile
 import os
+import re
+import shutil
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 
-def extract_miz(miz_path, repo_path):
-    extracted = []
-    overwritten = []
+# Limits applied before anything is written to the repo
+MAX_TOTAL_SIZE = 2 * 1024 ** 3      # 2 GiB uncompressed
+MAX_RATIO = 500                     # uncompressed / compressed per member
+RATIO_MIN_SIZE = 1024 ** 2          # only apply ratio check above this size
+MAX_MEMBERS = 20000
+
+
+def _is_safe_path(name, repo_path):
+    if not name or name.startswith(("/", "\\")) or os.path.isabs(name):
+        return False
+    if ":" in name.split("/")[0]:
+        return False
+    parts = name.replace("\\", "/").split("/")
+    if ".." in parts:
+        return False
+    root = os.path.realpath(repo_path)
+    target = os.path.realpath(os.path.join(root, name))
+    return target == root or target.startswith(root + os.sep)
 
+
+def _check_crc(miz_path, names):
+    """
+    Read the given members to the end; zipfile checks the CRC32
+    itself and raises BadZipFile on a mismatch.
+    Each worker uses its own ZipFile handle.
+    Returns a list of (name, error) for bad members.
+    """
+    bad = []
+    with zipfile.ZipFile(miz_path, "r") as z:
+        for name in names:
+            try:
+                with z.open(name, "r") as src:
+                    while src.read(1024 * 1024):
+                        pass
+            except (zipfile.BadZipFile, zlib.error, EOFError) as e:
+                bad.append((name, str(e)))
+    return bad
+
+
+def verify_miz(miz_path, repo_path, workers=None):
+    """
+    Validate a .miz archive before extracting it.
+
+    Checks the central directory, path safety, size and ratio limits,
+    then the CRC of every member in parallel. Raises ValueError on the
+    first class of problem found, so nothing gets written.
+    """
+    try:
+        with zipfile.ZipFile(miz_path, "r") as z:
+            members = z.infolist()
+    except zipfile.BadZipFile as e:
+        raise ValueError(f"Corrupt .miz archive: {e}")
+
+    if len(members) > MAX_MEMBERS:
+        raise ValueError(f"Too many members in archive: {len(members)}")
+
+    seen = set()
+    duplicates = []
+    for m in members:
+        if m.filename in seen:
+            duplicates.append(m.filename)
+        seen.add(m.filename)
+    if duplicates:
+        raise ValueError(f"Duplicate members in archive: {', '.join(duplicates[:5])}")
+
+    unsafe = [m.filename for m in members if not _is_safe_path(m.filename, repo_path)]
+    if unsafe:
+        raise ValueError(f"Unsafe paths in archive: {', '.join(unsafe[:5])}")
+
+    total = 0
+    files = []
+    for m in members:
+        if m.is_dir():
+            continue
+        total += m.file_size
+        if (m.file_size > RATIO_MIN_SIZE and m.compress_size
+                and m.file_size / m.compress_size > MAX_RATIO):
+            raise ValueError(f"Suspicious compression ratio: {m.filename}")
+        files.append(m)
+
+    if total > MAX_TOTAL_SIZE:
+        raise ValueError(f"Archive too large when extracted: {total} bytes")
+
+    # Spread members across workers, balanced by size
+    workers = workers or min(len(files), os.cpu_count() or 1) or 1
+    buckets = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for m in sorted(files, key=lambda m: m.file_size, reverse=True):
+        i = loads.index(min(loads))
+        buckets[i].append(m.filename)
+        loads[i] += m.file_size
+
+    bad = []
+    if workers == 1:
+        # No point paying for a pool on a single core
+        bad = _check_crc(miz_path, buckets[0])
+    else:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for result in pool.map(lambda names: _check_crc(miz_path, names), buckets):
+                bad.extend(result)
+
+    if bad:
+        details = ", ".join(f"{n} ({err})" for n, err in bad[:5])
+        raise ValueError(f"Corrupt members in archive: {details}")
+
+    return {
+        "members": len(files),
+        "bytes": total,
+    }
+
+
+def staging_path(repo_path):
+    """
+    Staging directory next to the repo, so the final os.replace
+    stays on the same filesystem and is atomic per file.
+    """
+    return os.path.normpath(repo_path) + ".staging"
+
+
+def stage_miz(miz_path, repo_path):
+    """
+    Verify and extract the archive into the staging directory.
+    The repo itself is not touched. Returns the list of staged files.
+    """
+    verify_miz(miz_path, repo_path)
+
+    staging = staging_path(repo_path)
+    if os.path.isdir(staging):
+        shutil.rmtree(staging)
+
+    manifest = []
     with zipfile.ZipFile(miz_path, "r") as z:
         for member in z.infolist():
-            target = os.path.join(repo_path, member.filename)
+            target = os.path.join(staging, member.filename)
 
             if member.is_dir():
                 os.makedirs(target, exist_ok=True)
@@ -15,14 +146,178 @@ def extract_miz(miz_path, repo_path):
 
             os.makedirs(os.path.dirname(target), exist_ok=True)
 
-            if os.path.exists(target):
-                overwritten.append(member.filename)
-            else:
-                extracted.append(member.filename)
-
             with z.open(member, "r") as src, open(target, "wb") as dst:
-                dst.write(src.read())
+                shutil.copyfileobj(src, dst)
+
+            manifest.append(member.filename)
+
+    return manifest
+
+
+def swap_staged(repo_path, manifest):
+    """
+    Move staged files into the repo. Safe to run again after an
+    interruption: files already moved are simply reported again.
+    """
+    extracted = []
+    overwritten = []
+    staging = staging_path(repo_path)
+
+    for name in manifest:
+        src = os.path.join(staging, name)
+        target = os.path.join(repo_path, name)
+
+        if not os.path.exists(src):
+            # Moved before the interruption
+            overwritten.append(name)
+            continue
+
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        if os.path.exists(target):
+            overwritten.append(name)
+        else:
+            extracted.append(name)
+
+        os.replace(src, target)
+
+    if os.path.isdir(staging):
+        shutil.rmtree(staging)
 
     return extracted, overwritten
 
 
+def extract_miz(miz_path, repo_path):
+    manifest = stage_miz(miz_path, repo_path)
+    return swap_staged(repo_path, manifest)
+
+
+RESKEY_RE = re.compile(r"ResKey_\w+")
+MAP_ENTRY_RE = re.compile(r'\["(ResKey_\w+)"\]\s*=\s*"([^"]*)"')
+
+# Lua tables that live alongside resources but are never resources themselves
+L10N_TABLES = ("dictionary", "mapResource")
+
+# Members searched for references once they are known to be kept
+SCRIPT_EXTENSIONS = ("", ".lua", ".txt")
+
+
+def _l10n_parts(name):
+    """
+    Returns (lang, filename) for members directly under l10n/<lang>/.
+    """
+    parts = name.split("/")
+    if len(parts) == 3 and parts[0] == "l10n" and parts[2]:
+        return parts[1], parts[2]
+    return None
+
+
+def _is_script(name):
+    return os.path.splitext(name)[1].lower() in SCRIPT_EXTENSIONS
+
+
+def find_unused_resources(miz_path):
+    """
+    Cross-reference l10n/<lang>/mapResource and the trigger actions in
+    the mission file against the archive listing.
+
+    A resource is kept if a ResKey used by kept Lua maps to it, or if its
+    filename appears in the text of kept Lua (e.g. scripts loading it by
+    name with outSound). Lua resources that are kept are searched too,
+    until nothing new turns up. Returns [(member name, bytes)] for the
+    rest, largest first.
+    """
+    with zipfile.ZipFile(miz_path, "r") as z:
+        def read_text(name):
+            return z.read(name).decode("utf-8", errors="replace")
+
+        mappings = {}
+        texts = []
+        resources = []
+        for info in z.infolist():
+            if info.is_dir():
+                continue
+            parts = _l10n_parts(info.filename)
+            if parts and parts[1] == "mapResource":
+                # Lists every resource, used or not; only read for the mapping
+                mappings[parts[0]] = MAP_ENTRY_RE.findall(read_text(info.filename))
+            elif parts and parts[1] not in L10N_TABLES:
+                resources.append(info)
+            elif _is_script(info.filename):
+                # mission, dictionary, options, warehouses, ...
+                texts.append(read_text(info.filename))
+
+        used = set()
+        while True:
+            used_keys = set()
+            for text in texts:
+                used_keys.update(RESKEY_RE.findall(text))
+
+            new_texts = []
+            for info in resources:
+                if info.filename in used:
+                    continue
+
+                lang, filename = _l10n_parts(info.filename)
+                mapped = any(
+                    key in used_keys and f == filename
+                    for key, f in mappings.get(lang, [])
+                )
+                if not mapped and not any(filename in text for text in texts):
+                    continue
+
+                used.add(info.filename)
+                if _is_script(filename):
+                    new_texts.append(read_text(info.filename))
+
+            if not new_texts:
+                break
+            texts.extend(new_texts)
+
+        unused = [
+            (info.filename, info.file_size)
+            for info in resources
+            if info.filename not in used
+        ]
+
+    return sorted(unused, key=lambda u: u[1], reverse=True)
+
+
+def slim_miz(miz_path, out_path, unused=None):
+    """
+    Write a copy of the archive without the unused resources, and
+    drop their now dangling mapResource entries.
+    Returns the list of removed members.
+    """
+    if unused is None:
+        unused = find_unused_resources(miz_path)
+    removed = {name for name, _ in unused}
+
+    # Files removed per language, to prune mapResource
+    removed_files = {}
+    for name in removed:
+        lang, filename = _l10n_parts(name)
+        removed_files.setdefault(lang, set()).add(filename)
+
+    def keep_entry(lang, line):
+        m = MAP_ENTRY_RE.search(line)
+        return not m or m.group(2) not in removed_files.get(lang, set())
+
+    tmp = out_path + ".tmp"
+    with zipfile.ZipFile(miz_path, "r") as src, \
+            zipfile.ZipFile(tmp, "w", zipfile.ZIP_DEFLATED) as dst:
+        for info in src.infolist():
+            if info.filename in removed:
+                continue
+
+            data = src.read(info)
+            parts = _l10n_parts(info.filename)
+            if parts and parts[1] == "mapResource" and parts[0] in removed_files:
+                text = data.decode("utf-8")
+                lines = [l for l in text.split("\n") if keep_entry(parts[0], l)]
+                data = "\n".join(lines).encode("utf-8")
+
+            dst.writestr(info, data)
+
+    os.replace(tmp, out_path)
+    return sorted(removed)